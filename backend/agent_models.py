@@ -39,12 +39,26 @@ class AgentStatus(str, Enum):
     CONNECTING = "connecting"
 
 
+# Literal equivalents of the enums above, used on request models so validation
+# is a plain membership check and the parsed value is already the wire string
+AgentScenarioValue = Literal["language_tutor", "conversation_partner", "interview_practice", "travel_companion"]
+AgentLanguageValue = Literal["english", "french", "german", "korean", "mandarin", "spanish"]
+AgentVoiceValue = Literal[
+    "aura-2-thalia-en",
+    "aura-2-andromeda-en",
+    "aura-2-apollo-en",
+    "aura-2-aries-en",
+    "aura-2-arcas-en",
+    "aura-2-helena-en",
+]
+
+
 # Request Models
 class AgentStartRequest(BaseModel):
     user_id: str = Field(..., description="User identifier")
-    language: AgentLanguage = Field(default=AgentLanguage.ENGLISH, description="Conversation language")
-    scenario: AgentScenario = Field(default=AgentScenario.LANGUAGE_TUTOR, description="Conversation scenario")
-    voice_model: AgentVoice = Field(default=AgentVoice.THALIA, description="Voice model for the agent")
+    language: AgentLanguageValue = Field(default="english", description="Conversation language")
+    scenario: AgentScenarioValue = Field(default="language_tutor", description="Conversation scenario")
+    voice_model: AgentVoiceValue = Field(default="aura-2-thalia-en", description="Voice model for the agent")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0, description="AI response randomness (0-2)")
     custom_prompt: Optional[str] = Field(None, description="Custom prompt for the agent")
 
@@ -68,7 +82,7 @@ class AgentPromptUpdateRequest(AgentUpdateRequest):
 
 
 class AgentVoiceUpdateRequest(AgentUpdateRequest):
-    voice_model: AgentVoice = Field(..., description="New voice model for the agent")
+    voice_model: AgentVoiceValue = Field(..., description="New voice model for the agent")
 
 
 class AgentEndRequest(BaseModel):
@@ -137,12 +151,21 @@ class AgentEvent(BaseModel):
     timestamp: Optional[datetime] = None
     data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    
+    class Config:
+        frozen = True
+        extra = "forbid"
 
 
 class AgentAudioEvent(BaseModel):
     session_id: str
     audio_data: bytes
     timestamp: datetime
+    
+    class Config:
+        frozen = True
+        extra = "forbid"
+        ser_json_bytes = "base64"  # only applies when dumped to JSON; raw bytes are kept internally
 
 
 class AgentConversationEvent(BaseModel):
@@ -150,6 +173,10 @@ class AgentConversationEvent(BaseModel):
     role: Literal["user", "assistant"]
     content: str
     timestamp: datetime
+    
+    class Config:
+        frozen = True
+        extra = "forbid"
 
 
 class AgentStatusEvent(BaseModel):
@@ -157,6 +184,10 @@ class AgentStatusEvent(BaseModel):
     status: AgentStatus
     message: Optional[str] = None
     timestamp: datetime
+    
+    class Config:
+        frozen = True
+        extra = "forbid"
 
 
 # Database Models
@@ -267,6 +298,10 @@ class WebSocketMessage(BaseModel):
     session_id: str
     timestamp: datetime
     data: Dict[str, Any]
+    
+    class Config:
+        frozen = True
+        extra = "forbid"
 
 
 class AudioDataMessage(WebSocketMessage):
@@ -2,15 +2,17 @@
 Voice Agent API routes for conversational interactions using Deepgram's Voice Agent.
 """
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
-from typing import Optional, List, Dict, Any
-import json
+from fastapi.responses import JSONResponse, Response
+from typing import Optional, List, Dict, Any, Set
+from collections import defaultdict
+import orjson
 import uuid
+import secrets
 import asyncio
 import base64
-from datetime import datetime
+import logging
 
-from agent_service import VoiceAgentService
+from agent_service import get_voice_agent_service, iso_now
 from agent_models import (
     AgentStartRequest,
     AgentStartResponse,
@@ -26,6 +28,7 @@ from agent_models import (
     AgentHistoryRequest,
     AgentHistoryResponse,
     AgentActiveSessionsResponse,
+    AgentSessionInfo,
     AgentScenario,
     AgentLanguage,
     AgentVoice,
@@ -37,40 +40,207 @@ from agent_models import (
 )
 from supabase_client import SupabaseManager
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/agent", tags=["voice-agent"])
-agent_service = VoiceAgentService()
-supabase_manager = SupabaseManager()
+agent_service = get_voice_agent_service()
 
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.connection_sessions: Dict[str, str] = {}  # connection_id -> session_id
+        self.session_connections: Dict[str, Set[str]] = defaultdict(set)  # session_id -> connection_ids
     
     async def connect(self, websocket: WebSocket, session_id: str):
         await websocket.accept()
-        connection_id = str(uuid.uuid4())
+        connection_id = secrets.token_hex(16)
         self.active_connections[connection_id] = websocket
         self.connection_sessions[connection_id] = session_id
+        self.session_connections[session_id].add(connection_id)
         return connection_id
     
     def disconnect(self, connection_id: str):
         if connection_id in self.active_connections:
             del self.active_connections[connection_id]
-        if connection_id in self.connection_sessions:
-            del self.connection_sessions[connection_id]
+        session_id = self.connection_sessions.pop(connection_id, None)
+        if session_id is not None:
+            connection_ids = self.session_connections.get(session_id)
+            if connection_ids is not None:
+                connection_ids.discard(connection_id)
+                if not connection_ids:
+                    del self.session_connections[session_id]
     
     async def send_personal_message(self, message: dict, connection_id: str):
         if connection_id in self.active_connections:
-            await self.active_connections[connection_id].send_text(json.dumps(message))
+            await self.active_connections[connection_id].send_text(orjson.dumps(message).decode())
     
     async def broadcast_to_session(self, message: dict, session_id: str):
-        for connection_id, ws_session_id in self.connection_sessions.items():
-            if ws_session_id == session_id and connection_id in self.active_connections:
-                await self.active_connections[connection_id].send_text(json.dumps(message))
+        websockets = [
+            self.active_connections[connection_id]
+            for connection_id in self.session_connections.get(session_id, ())
+            if connection_id in self.active_connections
+        ]
+        if not websockets:
+            return
+        
+        # Serialize once, then send to every client of the session concurrently
+        payload = orjson.dumps(message).decode()
+        await asyncio.gather(*(ws.send_text(payload) for ws in websockets), return_exceptions=True)
 
 manager = ConnectionManager()
 
+# Background batching of non-critical database writes
+_DB_BATCH_SIZE = 100
+_DB_BATCH_WINDOW = 0.05  # seconds
+_db_write_queue: Optional[asyncio.Queue] = None
+_db_writer_task: Optional[asyncio.Task] = None
+
+
+def _queue_db_update(table: str, row_id: str, fields: Dict[str, Any], timestamp_field: Optional[str] = None):
+    """
+    Queue an update of a single row to be written by the background writer.
+    
+    Args:
+        table: Table name
+        row_id: Value of the row's id column
+        fields: Columns to update
+        timestamp_field: Optional column stamped with the batch time when written
+    """
+    global _db_write_queue, _db_writer_task
+    if _db_write_queue is None:
+        _db_write_queue = asyncio.Queue()
+    if _db_writer_task is None or _db_writer_task.done():
+        _db_writer_task = asyncio.create_task(_db_writer())
+    _db_write_queue.put_nowait((table, row_id, fields, timestamp_field))
+
+
+async def _db_writer():
+    """Drain queued updates, coalescing identical updates into one request per batch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _db_write_queue.get()]
+        deadline = loop.time() + _DB_BATCH_WINDOW
+        while len(batch) < _DB_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_db_write_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        # Group rows that receive the same update so each group is one UPDATE ... WHERE id IN (...)
+        batch_time = iso_now()
+        groups: Dict[tuple, List[str]] = defaultdict(list)
+        for table, row_id, fields, timestamp_field in batch:
+            if timestamp_field:
+                fields = {**fields, timestamp_field: batch_time}
+            groups[(table, tuple(sorted(fields.items())))].append(row_id)
+        
+        client = SupabaseManager.get_client()
+        if client is None:
+            continue
+        # Rows inserted by the agent service's writer must exist before they can be updated
+        await agent_service.flush_session_rows()
+        for (table, items), row_ids in groups.items():
+            try:
+                query = client.table(table).update(dict(items)).in_("id", row_ids)
+                await asyncio.to_thread(query.execute)
+            except Exception as e:
+                logger.error(f"Error writing {len(row_ids)} queued update(s) to {table}: {str(e)}")
+
+
+# Static catalogue payloads, serialized once at import
+_SCENARIOS_JSON = orjson.dumps({
+    "success": True,
+    "scenarios": [
+        {
+            "value": AgentScenario.LANGUAGE_TUTOR,
+            "name": "Language Tutor",
+            "description": "Practice speaking with a patient language tutor who provides gentle corrections and vocabulary help."
+        },
+        {
+            "value": AgentScenario.CONVERSATION_PARTNER,
+            "name": "Conversation Partner",
+            "description": "Engage in natural, flowing conversation on various topics."
+        },
+        {
+            "value": AgentScenario.INTERVIEW_PRACTICE,
+            "name": "Interview Practice",
+            "description": "Practice professional interview skills with feedback on your responses."
+        },
+        {
+            "value": AgentScenario.TRAVEL_COMPANION,
+            "name": "Travel Companion",
+            "description": "Practice travel-related conversations and learn travel vocabulary."
+        }
+    ]
+})
+
+_LANGUAGES_JSON = orjson.dumps({
+    "success": True,
+    "languages": [
+        {"value": AgentLanguage.ENGLISH, "name": "English", "flag": "🇺🇸"},
+        {"value": AgentLanguage.FRENCH, "name": "French", "flag": "🇫🇷"},
+        {"value": AgentLanguage.GERMAN, "name": "German", "flag": "🇩🇪"},
+        {"value": AgentLanguage.KOREAN, "name": "Korean", "flag": "🇰🇷"},
+        {"value": AgentLanguage.MANDARIN, "name": "Mandarin Chinese", "flag": "🇨🇳"},
+        {"value": AgentLanguage.SPANISH, "name": "Spanish", "flag": "🇪🇸"}
+    ]
+})
+
+_VOICES_JSON = orjson.dumps({
+    "success": True,
+    "voices": [
+        {
+            "value": AgentVoice.THALIA,
+            "name": "Thalia",
+            "description": "Natural female voice, warm and friendly",
+            "language": "English"
+        },
+        {
+            "value": AgentVoice.ANDROMEDA,
+            "name": "Andromeda",
+            "description": "Natural female voice, clear and articulate",
+            "language": "English"
+        },
+        {
+            "value": AgentVoice.APOLLO,
+            "name": "Apollo",
+            "description": "Natural male voice, confident and professional",
+            "language": "English"
+        },
+        {
+            "value": AgentVoice.ARIES,
+            "name": "Aries",
+            "description": "Natural male voice, energetic and engaging",
+            "language": "English"
+        },
+        {
+            "value": AgentVoice.ARCAS,
+            "name": "Arcas",
+            "description": "Natural male voice, calm and soothing",
+            "language": "English"
+        },
+        {
+            "value": AgentVoice.HELENA,
+            "name": "Helena",
+            "description": "Natural female voice, sophisticated and elegant",
+            "language": "English"
+        }
+    ]
+})
+
+_CAPABILITIES = AgentCapabilities(
+    supported_languages=list(AgentLanguage),
+    supported_scenarios=list(AgentScenario),
+    supported_voices=list(AgentVoice),
+    max_session_duration=120,  # 2 hours
+    max_audio_chunk_size=8192,  # bytes
+    supported_audio_formats=["linear16", "wav", "mp3"]
+)
+
 
 @router.post("/start", response_model=AgentStartResponse)
 async def start_conversation(request: AgentStartRequest):
@@ -87,10 +257,13 @@ async def start_conversation(request: AgentStartRequest):
         # Generate unique session ID
         session_id = str(uuid.uuid4())
         
+        # Agent events arrive on the Deepgram listener thread, so hand them back to this loop
+        loop = asyncio.get_running_loop()
+        
         # Define message callback for WebSocket events
         def on_message(message_data: Dict[str, Any]):
             # This will be handled by WebSocket connections
-            asyncio.create_task(manager.broadcast_to_session(message_data, session_id))
+            asyncio.run_coroutine_threadsafe(manager.broadcast_to_session(message_data, session_id), loop)
         
         def on_audio(audio_data: bytes, session_id: str):
             # Handle audio data - could be streamed to client
@@ -100,17 +273,23 @@ async def start_conversation(request: AgentStartRequest):
         result = await agent_service.start_conversation(
             session_id=session_id,
             user_id=request.user_id,
-            language=request.language.value,
-            scenario=request.scenario.value,
-            voice_model=request.voice_model.value,
+            language=request.language,
+            scenario=request.scenario,
+            voice_model=request.voice_model,
             temperature=request.temperature,
             custom_prompt=request.custom_prompt,
             on_message=on_message,
             on_audio=on_audio
         )
         
-        return AgentStartResponse(**result)
+        if not result["success"]:
+            status_code = 503 if result.get("degraded") else 500
+            raise HTTPException(status_code=status_code, detail=result["message"])
+        
+        return AgentStartResponse.model_construct(**result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start conversation: {str(e)}")
 
@@ -126,22 +305,22 @@ async def send_audio(request: AgentAudioRequest):
     Returns:
         Success status
     """
-    try:
-        success = agent_service.send_audio(request.session_id, request.audio_data)
-        
-        if success:
-            return AgentAudioResponse(
-                success=True,
-                message="Audio data sent successfully"
-            )
-        else:
-            return AgentAudioResponse(
-                success=False,
-                message="Failed to send audio data - session not found or inactive"
-            )
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send audio: {str(e)}")
+    # Reject unknown sessions here, before crossing into the service
+    success = (
+        request.session_id in agent_service.active_connections
+        and agent_service.send_audio(request.session_id, request.audio_data)
+    )
+    
+    if success:
+        return AgentAudioResponse.model_construct(
+            success=True,
+            message="Audio data sent successfully"
+        )
+    else:
+        return AgentAudioResponse.model_construct(
+            success=False,
+            message="Failed to send audio data - session not found or inactive"
+        )
 
 
 @router.post("/message", response_model=AgentTextMessageResponse)
@@ -155,22 +334,21 @@ async def send_text_message(request: AgentTextMessageRequest):
     Returns:
         Success status
     """
-    try:
-        success = agent_service.send_text_message(request.session_id, request.content)
-        
-        if success:
-            return AgentTextMessageResponse(
-                success=True,
-                message="Text message sent successfully"
-            )
-        else:
-            return AgentTextMessageResponse(
-                success=False,
-                message="Failed to send text message - session not found or inactive"
-            )
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send text message: {str(e)}")
+    success = (
+        request.session_id in agent_service.active_connections
+        and agent_service.send_text_message(request.session_id, request.content)
+    )
+    
+    if success:
+        return AgentTextMessageResponse.model_construct(
+            success=True,
+            message="Text message sent successfully"
+        )
+    else:
+        return AgentTextMessageResponse.model_construct(
+            success=False,
+            message="Failed to send text message - session not found or inactive"
+        )
 
 
 @router.put("/prompt", response_model=AgentUpdateResponse)
@@ -184,22 +362,18 @@ async def update_agent_prompt(request: AgentPromptUpdateRequest):
     Returns:
         Success status
     """
-    try:
-        success = agent_service.update_agent_prompt(request.session_id, request.new_prompt)
-        
-        if success:
-            return AgentUpdateResponse(
-                success=True,
-                message="Agent prompt updated successfully"
-            )
-        else:
-            return AgentUpdateResponse(
-                success=False,
-                message="Failed to update prompt - session not found or inactive"
-            )
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update prompt: {str(e)}")
+    success = agent_service.update_agent_prompt(request.session_id, request.new_prompt)
+    
+    if success:
+        return AgentUpdateResponse.model_construct(
+            success=True,
+            message="Agent prompt updated successfully"
+        )
+    else:
+        return AgentUpdateResponse.model_construct(
+            success=False,
+            message="Failed to update prompt - session not found or inactive"
+        )
 
 
 @router.put("/voice", response_model=AgentUpdateResponse)
@@ -213,22 +387,18 @@ async def update_agent_voice(request: AgentVoiceUpdateRequest):
     Returns:
         Success status
     """
-    try:
-        success = agent_service.update_agent_voice(request.session_id, request.voice_model.value)
-        
-        if success:
-            return AgentUpdateResponse(
-                success=True,
-                message="Agent voice updated successfully"
-            )
-        else:
-            return AgentUpdateResponse(
-                success=False,
-                message="Failed to update voice - session not found or inactive"
-            )
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update voice: {str(e)}")
+    success = agent_service.update_agent_voice(request.session_id, request.voice_model)
+    
+    if success:
+        return AgentUpdateResponse.model_construct(
+            success=True,
+            message="Agent voice updated successfully"
+        )
+    else:
+        return AgentUpdateResponse.model_construct(
+            success=False,
+            message="Failed to update voice - session not found or inactive"
+        )
 
 
 @router.post("/end", response_model=AgentEndResponse)
@@ -242,31 +412,22 @@ async def end_conversation(request: AgentEndRequest):
     Returns:
         Success status
     """
-    try:
-        success = agent_service.end_conversation(request.session_id)
+    # Closing the agent socket blocks on the WebSocket close handshake
+    success = await asyncio.to_thread(agent_service.end_conversation, request.session_id)
+    
+    if success:
+        # Update session in database (batched in the background, not critical)
+        _queue_db_update("agent_sessions", request.session_id, {"status": "ended"}, timestamp_field="ended_at")
         
-        if success:
-            # Update session in database
-            try:
-                supabase_manager.client.table("agent_sessions").update({
-                    "status": "ended",
-                    "ended_at": datetime.utcnow().isoformat()
-                }).eq("id", request.session_id).execute()
-            except:
-                pass  # Database update is not critical
-            
-            return AgentEndResponse(
-                success=True,
-                message="Conversation ended successfully"
-            )
-        else:
-            return AgentEndResponse(
-                success=False,
-                message="Failed to end conversation - session not found or already ended"
-            )
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to end conversation: {str(e)}")
+        return AgentEndResponse.model_construct(
+            success=True,
+            message="Conversation ended successfully"
+        )
+    else:
+        return AgentEndResponse.model_construct(
+            success=False,
+            message="Failed to end conversation - session not found or already ended"
+        )
 
 
 @router.get("/history/{session_id}", response_model=AgentHistoryResponse)
@@ -280,16 +441,23 @@ async def get_conversation_history(session_id: str):
     Returns:
         Conversation history and session info
     """
-    try:
-        # Get conversation history from service
-        history = agent_service.get_conversation_history(session_id)
-        
-        # Get session info from database
-        session_info = None
+    # Get conversation history from service
+    history = agent_service.get_conversation_history(session_id)
+    
+    # Get session info from database
+    session_info = None
+    client = SupabaseManager.get_client()
+    if client is not None:
         try:
-            response = supabase_manager.client.table("agent_sessions").select("*").eq("id", session_id).execute()
-            if response.data:
-                session_data = response.data[0]
+            query = (
+                client.table("agent_sessions")
+                .select("id,user_id,language,scenario,status,created_at,ended_at,duration")
+                .eq("id", session_id)
+                .maybe_single()
+            )
+            response = await asyncio.to_thread(query.execute)
+            if response and response.data:
+                session_data = response.data
                 session_info = {
                     "session_id": session_data["id"],
                     "user_id": session_data["user_id"],
@@ -300,17 +468,16 @@ async def get_conversation_history(session_id: str):
                     "ended_at": session_data.get("ended_at"),
                     "duration": session_data.get("duration", 0)
                 }
-        except:
-            pass
-        
-        return AgentHistoryResponse(
-            success=True,
-            conversation_history=history,
-            session_info=session_info
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get conversation history: {str(e)}")
+        except Exception as e:
+            # Session info is optional; the in-memory history is still returned
+            logger.warning(f"Could not load session info for {session_id}: {e}")
+    
+    # History and session rows come from our own service/database, so skip re-validation
+    return AgentHistoryResponse.model_construct(
+        success=True,
+        conversation_history=history,
+        session_info=session_info
+    )
 
 
 @router.get("/sessions", response_model=AgentActiveSessionsResponse)
@@ -321,30 +488,26 @@ async def get_active_sessions():
     Returns:
         List of active sessions
     """
-    try:
-        active_sessions = agent_service.get_active_sessions()
-        
-        # Convert to response model
-        session_infos = []
-        for session in active_sessions:
-            session_infos.append({
-                "session_id": session["session_id"],
-                "user_id": session["user_id"],
-                "language": session["language"],
-                "scenario": session["scenario"],
-                "status": AgentStatus.ACTIVE,
-                "start_time": datetime.fromisoformat(session["start_time"]),
-                "duration": session["duration"]
-            })
-        
-        return AgentActiveSessionsResponse(
-            success=True,
-            active_sessions=session_infos,
-            total_count=len(session_infos)
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get active sessions: {str(e)}")
+    active_sessions = agent_service.get_active_sessions()
+    
+    # Convert to response model (trusted internal data, no re-validation needed)
+    session_infos = []
+    for session in active_sessions:
+        session_infos.append(AgentSessionInfo.model_construct(
+            session_id=session["session_id"],
+            user_id=session["user_id"],
+            language=session["language"],
+            scenario=session["scenario"],
+            status=AgentStatus.ACTIVE,
+            start_time=session["start_time"],
+            duration=session["duration"]
+        ))
+    
+    return AgentActiveSessionsResponse.model_construct(
+        success=True,
+        active_sessions=session_infos,
+        total_count=len(session_infos)
+    )
 
 
 @router.get("/scenarios")
@@ -355,34 +518,7 @@ async def get_available_scenarios():
     Returns:
         List of scenarios with descriptions
     """
-    try:
-        scenarios = [
-            {
-                "value": AgentScenario.LANGUAGE_TUTOR,
-                "name": "Language Tutor",
-                "description": "Practice speaking with a patient language tutor who provides gentle corrections and vocabulary help."
-            },
-            {
-                "value": AgentScenario.CONVERSATION_PARTNER,
-                "name": "Conversation Partner",
-                "description": "Engage in natural, flowing conversation on various topics."
-            },
-            {
-                "value": AgentScenario.INTERVIEW_PRACTICE,
-                "name": "Interview Practice",
-                "description": "Practice professional interview skills with feedback on your responses."
-            },
-            {
-                "value": AgentScenario.TRAVEL_COMPANION,
-                "name": "Travel Companion",
-                "description": "Practice travel-related conversations and learn travel vocabulary."
-            }
-        ]
-        
-        return {"success": True, "scenarios": scenarios}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get scenarios: {str(e)}")
+    return Response(content=_SCENARIOS_JSON, media_type="application/json")
 
 
 @router.get("/languages")
@@ -393,20 +529,7 @@ async def get_available_languages():
     Returns:
         List of supported languages
     """
-    try:
-        languages = [
-            {"value": AgentLanguage.ENGLISH, "name": "English", "flag": "🇺🇸"},
-            {"value": AgentLanguage.FRENCH, "name": "French", "flag": "🇫🇷"},
-            {"value": AgentLanguage.GERMAN, "name": "German", "flag": "🇩🇪"},
-            {"value": AgentLanguage.KOREAN, "name": "Korean", "flag": "🇰🇷"},
-            {"value": AgentLanguage.MANDARIN, "name": "Mandarin Chinese", "flag": "🇨🇳"},
-            {"value": AgentLanguage.SPANISH, "name": "Spanish", "flag": "🇪🇸"}
-        ]
-        
-        return {"success": True, "languages": languages}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get languages: {str(e)}")
+    return Response(content=_LANGUAGES_JSON, media_type="application/json")
 
 
 @router.get("/voices")
@@ -417,50 +540,7 @@ async def get_available_voices():
     Returns:
         List of supported voice models
     """
-    try:
-        voices = [
-            {
-                "value": AgentVoice.THALIA,
-                "name": "Thalia",
-                "description": "Natural female voice, warm and friendly",
-                "language": "English"
-            },
-            {
-                "value": AgentVoice.ANDROMEDA,
-                "name": "Andromeda",
-                "description": "Natural female voice, clear and articulate",
-                "language": "English"
-            },
-            {
-                "value": AgentVoice.APOLLO,
-                "name": "Apollo",
-                "description": "Natural male voice, confident and professional",
-                "language": "English"
-            },
-            {
-                "value": AgentVoice.ARIES,
-                "name": "Aries",
-                "description": "Natural male voice, energetic and engaging",
-                "language": "English"
-            },
-            {
-                "value": AgentVoice.ARCAS,
-                "name": "Arcas",
-                "description": "Natural male voice, calm and soothing",
-                "language": "English"
-            },
-            {
-                "value": AgentVoice.HELENA,
-                "name": "Helena",
-                "description": "Natural female voice, sophisticated and elegant",
-                "language": "English"
-            }
-        ]
-        
-        return {"success": True, "voices": voices}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get voices: {str(e)}")
+    return Response(content=_VOICES_JSON, media_type="application/json")
 
 
 @router.get("/capabilities", response_model=AgentCapabilities)
@@ -471,18 +551,7 @@ async def get_agent_capabilities():
     Returns:
         Agent capabilities information
     """
-    try:
-        return AgentCapabilities(
-            supported_languages=list(AgentLanguage),
-            supported_scenarios=list(AgentScenario),
-            supported_voices=list(AgentVoice),
-            max_session_duration=120,  # 2 hours
-            max_audio_chunk_size=8192,  # bytes
-            supported_audio_formats=["linear16", "wav", "mp3"]
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get capabilities: {str(e)}")
+    return _CAPABILITIES
 
 
 @router.get("/health", response_model=AgentHealthCheck)
@@ -516,49 +585,103 @@ async def health_check():
         )
 
 
+_AUDIO_QUEUE_SIZE = 8  # frames buffered between the client socket and Deepgram
+_AUDIO_BATCH_BYTES = 24000 * 2 // 20  # 50 ms of 24 kHz linear16
+_AUDIO_BATCH_WINDOW = 0.05  # seconds; every batch adds up to this much latency to live speech
+
+
+async def _forward_audio(session_id: str, audio_queue: asyncio.Queue):
+    """Send queued client audio frames to the agent in order, off the event loop.
+    
+    Frames are gathered into batches of up to 50 ms of audio (or whatever arrived
+    within 50 ms of the batch's first frame) and sent as one media frame each.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        chunks = [await audio_queue.get()]
+        batch_bytes = len(chunks[0])
+        deadline = loop.time() + _AUDIO_BATCH_WINDOW
+        while batch_bytes < _AUDIO_BATCH_BYTES:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(audio_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            chunks.append(chunk)
+            batch_bytes += len(chunk)
+        
+        audio_data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        await asyncio.to_thread(agent_service.send_audio, session_id, audio_data)
+
+
 @router.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """
     WebSocket endpoint for real-time communication with the voice agent.
     
+    Binary frames are treated as raw linear16 audio; text frames carry JSON
+    control messages (text, ping, and base64 audio for older clients).
+    
     Args:
         websocket: WebSocket connection
         session_id: Session identifier
     """
-    await manager.connect(websocket, session_id)
+    connection_id = await manager.connect(websocket, session_id)
+    
+    # Audio is forwarded to Deepgram by a separate task so receiving the next frame
+    # overlaps with sending the previous one; the bounded queue applies backpressure
+    audio_queue: asyncio.Queue = asyncio.Queue(maxsize=_AUDIO_QUEUE_SIZE)
+    audio_sender = asyncio.create_task(_forward_audio(session_id, audio_queue))
     
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            
+            # Binary frames carry raw audio, no JSON or base64 decoding needed
+            audio_data = frame.get("bytes")
+            if audio_data is not None:
+                if session_id in agent_service.active_connections:
+                    await audio_queue.put(audio_data)
+                continue
+            
+            message = orjson.loads(frame["text"])
             
             # Handle different message types
             if message.get("type") == "audio":
-                # Decode base64 audio data
-                audio_data = base64.b64decode(message.get("data", ""))
-                agent_service.send_audio(session_id, audio_data)
+                # Decode base64 audio data (legacy JSON audio frames)
+                if session_id in agent_service.active_connections:
+                    audio_data = base64.b64decode(message.get("data", ""))
+                    await audio_queue.put(audio_data)
                 
             elif message.get("type") == "text":
                 # Send text message to agent
-                content = message.get("content", "")
-                agent_service.send_text_message(session_id, content)
+                if session_id in agent_service.active_connections:
+                    content = message.get("content", "")
+                    agent_service.send_text_message(session_id, content)
                 
             elif message.get("type") == "ping":
                 # Respond to ping
                 await manager.send_personal_message({
                     "type": "pong",
-                    "timestamp": datetime.utcnow().isoformat()
-                }, connection_id=list(manager.connection_sessions.keys())[list(manager.connection_sessions.values()).index(session_id)])
+                    "timestamp": iso_now()
+                }, connection_id=connection_id)
                 
     except WebSocketDisconnect:
-        manager.disconnect(list(manager.connection_sessions.keys())[list(manager.connection_sessions.values()).index(session_id)])
+        manager.disconnect(connection_id)
         # End the conversation when WebSocket disconnects
-        agent_service.end_conversation(session_id)
+        await asyncio.to_thread(agent_service.end_conversation, session_id)
         
     except Exception as e:
         print(f"WebSocket error for session {session_id}: {str(e)}")
-        manager.disconnect(list(manager.connection_sessions.keys())[list(manager.connection_sessions.values()).index(session_id)])
+        manager.disconnect(connection_id)
+        
+    finally:
+        audio_sender.cancel()
 
 
 @router.get("/user/{user_id}/sessions")
@@ -573,8 +696,13 @@ async def get_user_sessions(user_id: str, limit: int = 10):
     Returns:
         List of user sessions
     """
+    client = SupabaseManager.get_client()
+    if client is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    
     try:
-        response = supabase_manager.client.table("agent_sessions").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+        query = client.table("agent_sessions").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit)
+        response = await asyncio.to_thread(query.execute)
         sessions = response.data
         
         return {"success": True, "sessions": sessions}
@@ -594,12 +722,17 @@ async def get_user_stats(user_id: str):
     Returns:
         User usage statistics
     """
+    client = SupabaseManager.get_client()
+    if client is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    
     try:
-        # Get all sessions for the user
-        response = supabase_manager.client.table("agent_sessions").select("*").eq("user_id", user_id).execute()
-        sessions = response.data
+        # Aggregate in the database (see supabase/migrations/20240121_agent_user_stats_aggregate.sql)
+        query = client.rpc("get_agent_user_stats", {"uid": user_id})
+        response = await asyncio.to_thread(query.execute)
+        stats = response.data[0] if response.data else None
         
-        if not sessions:
+        if not stats or not stats["total_sessions"]:
             return {
                 "success": True,
                 "total_sessions": 0,
@@ -609,32 +742,13 @@ async def get_user_stats(user_id: str):
                 "last_session": None
             }
         
-        # Calculate statistics
-        total_sessions = len(sessions)
-        total_duration = sum(s.get("duration", 0) for s in sessions)
-        
-        # Find favorites
-        languages = {}
-        scenarios = {}
-        for session in sessions:
-            lang = session.get("language", "unknown")
-            scenario = session.get("scenario", "unknown")
-            languages[lang] = languages.get(lang, 0) + 1
-            scenarios[scenario] = scenarios.get(scenario, 0) + 1
-        
-        favorite_language = max(languages, key=languages.get) if languages else None
-        favorite_scenario = max(scenarios, key=scenarios.get) if scenarios else None
-        
-        # Find last session
-        last_session = max(sessions, key=lambda s: s.get("created_at", ""))["created_at"]
-        
         return {
             "success": True,
-            "total_sessions": total_sessions,
-            "total_duration": total_duration,
-            "favorite_language": favorite_language,
-            "favorite_scenario": favorite_scenario,
-            "last_session": last_session
+            "total_sessions": stats["total_sessions"],
+            "total_duration": stats["total_duration"],
+            "favorite_language": stats["favorite_language"],
+            "favorite_scenario": stats["favorite_scenario"],
+            "last_session": stats["last_session"]
         }
         
     except Exception as e:
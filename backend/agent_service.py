@@ -2,12 +2,21 @@
 Voice Agent service using Deepgram's Voice Agent API for conversational interactions.
 """
 import os
-import json
 import asyncio
+import atexit
+import functools
+import logging
+import logging.handlers
+import queue
+import sys
 import threading
 import time
-from datetime import datetime
-from typing import Dict, Any, List, Optional, Callable
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Callable, ClassVar, ContextManager, Deque, FrozenSet, Mapping, NamedTuple, Tuple
 from deepgram import DeepgramClient
 from deepgram.core.events import EventType
 from deepgram.extensions.types.sockets import (
@@ -16,6 +25,7 @@ from deepgram.extensions.types.sockets import (
     AgentV1AudioInput,
     AgentV1AudioOutput,
     AgentV1DeepgramSpeakProvider,
+    AgentV1InjectUserMessageMessage,
     AgentV1Listen,
     AgentV1ListenProvider,
     AgentV1OpenAiThinkProvider,
@@ -23,88 +33,384 @@ from deepgram.extensions.types.sockets import (
     AgentV1SocketClientResponse,
     AgentV1SpeakProviderConfig,
     AgentV1Think,
+    AgentV1UpdatePromptMessage,
+    AgentV1UpdateSpeakMessage,
 )
 from providers.gemini import GeminiProvider
+from circuit_breaker import CircuitBreaker
 from supabase_client import SupabaseManager
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+
+class _ForwardToRootHandler(logging.Handler):
+    """Hands records to the root logger's handlers; runs on the log listener thread."""
+    
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger().handle(record)
+
+
+# Session threads only enqueue log records; one background listener does the writes
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+_log_listener = logging.handlers.QueueListener(_log_queue, _ForwardToRootHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+# Language mapping for agent configuration
+_LANGUAGE_MAPPING = MappingProxyType({
+    "english": "en",
+    "french": "fr",
+    "german": "de",
+    "korean": "ko",
+    "mandarin": "zh",
+    "spanish": "es"
+})
+
+# Per-language settings info, built once and shared read-only by every session
+_LANGUAGE_INFO = {
+    language: MappingProxyType({"code": code, "name": language.title()})
+    for language, code in _LANGUAGE_MAPPING.items()
+}
+
+# Agent personalities for different conversation scenarios
+_AGENT_PERSONALITIES = MappingProxyType({
+    "language_tutor": {
+        "role": "You are a friendly and patient language tutor.",
+        "instructions": (
+            "Help the user practice speaking in their target language. Your role is to:\n"
+            "1. Engage in natural conversation\n"
+            "2. Correct pronunciation and grammar gently\n"
+            "3. Provide vocabulary suggestions\n"
+            "4. Ask questions to encourage more speaking\n"
+            "5. Be encouraging and supportive\n"
+            "6. Adapt your responses to the user's proficiency level"
+        )
+    },
+    "conversation_partner": {
+        "role": "You are a friendly conversation partner.",
+        "instructions": (
+            "Engage in natural, flowing conversation with the user. Your role is to:\n"
+            "1. Ask open-ended questions about various topics\n"
+            "2. Share your own experiences and opinions\n"
+            "3. Listen actively and respond naturally\n"
+            "4. Keep the conversation interesting and engaging\n"
+            "5. Be supportive and encouraging"
+        )
+    },
+    "interview_practice": {
+        "role": "You are a professional interviewer.",
+        "instructions": (
+            "Conduct a mock interview with the user. Your role is to:\n"
+            "1. Ask common interview questions\n"
+            "2. Provide feedback on their responses\n"
+            "3. Help them practice professional communication\n"
+            "4. Ask follow-up questions to test their knowledge\n"
+            "5. Be professional yet encouraging"
+        )
+    },
+    "travel_companion": {
+        "role": "You are a knowledgeable travel guide.",
+        "instructions": (
+            "Help the user practice travel-related conversations. Your role is to:\n"
+            "1. Simulate travel scenarios (hotels, restaurants, directions)\n"
+            "2. Teach travel-related vocabulary\n"
+            "3. Provide cultural context and tips\n"
+            "4. Ask questions about travel plans and preferences\n"
+            "5. Be helpful and informative"
+        )
+    }
+})
+
+# System prompt layout used when no custom prompt is given
+_PROMPT_TEMPLATE = (
+    "{role}\n"
+    "\n"
+    "{instructions}\n"
+    "\n"
+    "Current date: {date}\n"
+    "\n"
+    "Language: {language}\n"
+    "Scenario: {scenario}\n"
+    "\n"
+    "Remember to:\n"
+    "- Speak naturally and conversationally\n"
+    "- Adjust your language level to match the user\n"
+    "- Be patient and encouraging\n"
+    "- Provide helpful feedback when appropriate\n"
+    "- Keep the conversation flowing naturally"
+)
+
+
+def _split_default_prompt(language_name: str, scenario: str, personality: Mapping[str, str]) -> Tuple[str, str]:
+    """Render the default prompt around its date, returning the (before, after) halves."""
+    marker = "\0"
+    rendered = _PROMPT_TEMPLATE.format(
+        role=personality["role"],
+        instructions=personality["instructions"],
+        date=marker,
+        language=language_name,
+        scenario=scenario.replace("_", " ").title(),
+    )
+    before, after = rendered.split(marker)
+    return before, after
+
+
+# Default prompts pre-rendered for every known (language, scenario) pair; only the date is filled per call
+_DEFAULT_PROMPT_PARTS = {
+    (language, scenario): _split_default_prompt(info["name"], scenario, personality)
+    for language, info in _LANGUAGE_INFO.items()
+    for scenario, personality in _AGENT_PERSONALITIES.items()
+}
+
+
+# Fields forwarded to the on_message callback for each agent event type; unlisted types forward the whole model
+_EVENT_FIELDS = MappingProxyType({
+    "Welcome": ("type", "request_id"),
+    "SettingsApplied": ("type",),
+    "ConversationText": ("type", "role", "content"),
+    "History": ("type", "role", "content", "function_calls"),  # a message or a function-call entry
+    "UserStartedSpeaking": ("type",),
+    "AgentThinking": ("type", "content"),
+    "AgentStartedSpeaking": ("type", "total_latency", "tts_latency", "ttt_latency"),
+    "AgentAudioDone": ("type",),
+    "FunctionCallRequest": ("type", "functions"),
+    "PromptUpdated": ("type",),
+    "SpeakUpdated": ("type",),
+    "InjectionRefused": ("type", "message"),
+    "Error": ("type", "description", "code"),
+    "Warning": ("type", "description", "code"),
+})
+
+
+# Agent event types kept from on_message by default; the speaking/audio markers are internal-only
+_DEFAULT_MUTED_EVENTS = frozenset({"AgentAudioDone", "AgentStartedSpeaking"})
+
+
+def _event_data(message: Any, msg_type: str) -> Dict[str, Any]:
+    """Fields of an agent event forwarded to on_message, with nested SDK models (e.g. functions) as dicts."""
+    fields = _EVENT_FIELDS.get(msg_type)
+    if fields is None:
+        return message.model_dump() if hasattr(message, "model_dump") else {"type": msg_type}
+    data = {}
+    for field in fields:
+        value = getattr(message, field, None)
+        if isinstance(value, list):
+            value = [item.dict() if hasattr(item, "dict") else item for item in value]
+        data[field] = value
+    return data
+
+
+# New session rows are inserted in batches by a background writer
+_SESSION_INSERT_BATCH_SIZE = 100
+_SESSION_INSERT_WINDOW = 0.1  # seconds
+
+
+# (epoch second, formatted "YYYY-MM-DDTHH:MM:SS" prefix) for iso_now
+_iso_cache = (0, "")
+
+
+def iso_now() -> str:
+    """Return the current UTC time in ISO format, reformatting the date part at most once per second."""
+    global _iso_cache
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    cached_seconds, prefix = _iso_cache
+    if seconds != cached_seconds:
+        prefix = datetime.utcfromtimestamp(seconds).strftime("%Y-%m-%dT%H:%M:%S")
+        _iso_cache = (seconds, prefix)
+    return f"{prefix}.{nanos // 1000:06d}"
+
+
+# (date ordinal, formatted date) for _get_today_str
+_today_cache = (0, "")
+
+
+def _get_today_str() -> str:
+    """Return today's date as used in agent prompts, formatting it at most once per day."""
+    global _today_cache
+    today = date.today()
+    ordinal = today.toordinal()
+    cached_ordinal, formatted = _today_cache
+    if ordinal != cached_ordinal:
+        formatted = today.strftime("%A, %B %d, %Y")
+        _today_cache = (ordinal, formatted)
+    return formatted
+
+
+# Per-session event history keeps only the most recent entries
+_EVENTS_LOG_SIZE = 2048
+
+
+class LogEntry(NamedTuple):
+    """One entry in a session's events log."""
+    timestamp: int  # time.monotonic_ns()
+    event: str
+
+
+class ConnectionState:
+    """Per-session state for an active voice agent connection."""
+    __slots__ = (
+        "session_id",
+        "user_id",
+        "language",
+        "scenario",
+        "on_message",
+        "on_audio",
+        "connection",
+        "connection_context",
+        "audio_bytes",
+        "conversation_log",
+        "events_log",
+        "is_active",
+        "start_time",
+        "start_monotonic",
+        "__weakref__",  # active_connections holds states weakly
+    )
+    
+    def __init__(
+        self,
+        session_id: str,
+        user_id: str,
+        language: str,
+        scenario: str,
+        on_message: Optional[Callable] = None,
+        on_audio: Optional[Callable] = None
+    ):
+        self.session_id: str = session_id
+        self.user_id: str = user_id
+        self.language: str = language
+        self.scenario: str = scenario
+        self.on_message: Optional[Callable] = on_message
+        self.on_audio: Optional[Callable] = on_audio
+        self.connection: Any = None
+        self.connection_context: Optional[ContextManager[Any]] = None  # open connect() context, exited on close
+        self.audio_bytes: int = 0  # size of the agent response being received
+        self.conversation_log: Deque[Dict[str, Any]] = deque(maxlen=settings.agent_max_conversation_log)
+        self.events_log: Deque[LogEntry] = deque(maxlen=_EVENTS_LOG_SIZE)  # filled only with DEBUG logging
+        self.is_active: bool = False
+        self.start_time: datetime = datetime.utcnow()
+        self.start_monotonic: float = time.monotonic()  # for durations, without datetime arithmetic
+
+
+# Guards the take-and-clear of ConnectionState.connection_context; on_close and end_conversation can race
+_connection_close_lock = threading.Lock()
+
+
+def _close_connection(connection_state: ConnectionState):
+    """Close the session's agent socket by exiting its connect() context; closing twice is a no-op."""
+    with _connection_close_lock:
+        context = connection_state.connection_context
+        connection_state.connection_context = None
+    if context is None:
+        return
+    try:
+        context.__exit__(None, None, None)
+    except Exception as e:
+        logger.warning(f"Error closing agent connection for session {connection_state.session_id}: {e}")
+
 
 class VoiceAgentService:
-    def __init__(self):
+    # Read-only tables shared by every instance
+    language_mapping: ClassVar[Mapping[str, str]] = _LANGUAGE_MAPPING
+    agent_personalities: ClassVar[Mapping[str, Mapping[str, str]]] = _AGENT_PERSONALITIES
+    
+    # Audio settings are identical for every session
+    _DEFAULT_AUDIO_CONFIG: ClassVar[AgentV1AudioConfig] = AgentV1AudioConfig(
+        input=AgentV1AudioInput(
+            encoding="linear16",
+            sample_rate=24000,
+        ),
+        output=AgentV1AudioOutput(
+            encoding="linear16",
+            sample_rate=24000,
+            container="wav",
+        ),
+    )
+    
+    def __init__(
+        self,
+        notify_events: Optional[FrozenSet[str]] = None,
+        muted_events: FrozenSet[str] = _DEFAULT_MUTED_EVENTS
+    ):
         # Initialize Deepgram client
         self.deepgram_client = DeepgramClient(api_key=settings.deepgram_api_key)
         
-        # Initialize Gemini provider for fallback functionality
-        self.gemini_provider = GeminiProvider()
+        # Agent event types forwarded to on_message callbacks (None forwards every type not muted)
+        self._notify_events = notify_events
+        self._muted_events = muted_events
         
-        # Initialize Supabase manager
-        self.supabase_manager = SupabaseManager()
+        # Active connections storage; entries disappear once their listener thread releases the state
+        self.active_connections: "weakref.WeakValueDictionary[str, ConnectionState]" = weakref.WeakValueDictionary()
         
-        # Active connections storage
-        self.active_connections: Dict[str, Dict[str, Any]] = {}
+        # Settings depend only on their arguments and the current date, so repeat sessions reuse them
+        self._cached_agent_settings = functools.lru_cache(maxsize=512)(self._build_agent_settings)
         
-        # Language mapping for agent configuration
-        self.language_mapping = {
-            "english": "en",
-            "french": "fr",
-            "german": "de",
-            "korean": "ko",
-            "mandarin": "zh",
-            "spanish": "es"
-        }
+        # Listen config is the same for every session; speak configs are built once per voice
+        self._listen_config = AgentV1Listen(
+            provider=AgentV1ListenProvider(
+                type="deepgram",
+                model=settings.deepgram_model,
+            )
+        )
+        self._speak_configs: Dict[str, AgentV1SpeakProviderConfig] = {}
         
-        # Agent personalities for different scenarios
-        self.agent_personalities = self._load_agent_personalities()
-    
-    def _load_agent_personalities(self) -> Dict[str, Dict[str, str]]:
-        """Load agent personalities for different conversation scenarios."""
-        return {
-            "language_tutor": {
-                "role": "You are a friendly and patient language tutor.",
-                "instructions": """
-                Help the user practice speaking in their target language. Your role is to:
-                1. Engage in natural conversation
-                2. Correct pronunciation and grammar gently
-                3. Provide vocabulary suggestions
-                4. Ask questions to encourage more speaking
-                5. Be encouraging and supportive
-                6. Adapt your responses to the user's proficiency level
-                """
-            },
-            "conversation_partner": {
-                "role": "You are a friendly conversation partner.",
-                "instructions": """
-                Engage in natural, flowing conversation with the user. Your role is to:
-                1. Ask open-ended questions about various topics
-                2. Share your own experiences and opinions
-                3. Listen actively and respond naturally
-                4. Keep the conversation interesting and engaging
-                5. Be supportive and encouraging
-                """
-            },
-            "interview_practice": {
-                "role": "You are a professional interviewer.",
-                "instructions": """
-                Conduct a mock interview with the user. Your role is to:
-                1. Ask common interview questions
-                2. Provide feedback on their responses
-                3. Help them practice professional communication
-                4. Ask follow-up questions to test their knowledge
-                5. Be professional yet encouraging
-                """
-            },
-            "travel_companion": {
-                "role": "You are a knowledgeable travel guide.",
-                "instructions": """
-                Help the user practice travel-related conversations. Your role is to:
-                1. Simulate travel scenarios (hotels, restaurants, directions)
-                2. Teach travel-related vocabulary
-                3. Provide cultural context and tips
-                4. Ask questions about travel plans and preferences
-                5. Be helpful and informative
-                """
-            }
+        # Handlers for specific agent event types, looked up once per message
+        self._event_handlers: Dict[str, Callable[[str, Any, ConnectionState], None]] = {
+            "Welcome": self._handle_welcome,
+            "SettingsApplied": self._handle_settings_applied,
+            "ConversationText": self._handle_conversation_text,
+            "UserStartedSpeaking": self._handle_user_started_speaking,
+            "AgentThinking": self._handle_agent_thinking,
+            "AgentStartedSpeaking": self._handle_agent_started_speaking,
+            "AgentAudioDone": self._handle_agent_audio_done,
+            "FunctionCallRequest": self._handle_function_call_request,
+            "Error": self._handle_error,
+            "Warning": self._handle_warning,
         }
+        
+        # Session rows waiting for the background insert writer (created on first use, inside the event loop)
+        self._session_rows: Optional[asyncio.Queue] = None
+        self._session_writer: Optional[asyncio.Task] = None
+        
+        # Stops new sessions from hammering Deepgram while its agent endpoint keeps failing
+        self._deepgram_breaker = CircuitBreaker(
+            failure_threshold=settings.deepgram_cb_failure_threshold,
+            reset_timeout=settings.deepgram_cb_reset_timeout_seconds,
+        )
+        
+        # Listener threads are reused across sessions; each live session occupies one worker
+        self._listener_executor = ThreadPoolExecutor(
+            max_workers=settings.agent_max_sessions,
+            thread_name_prefix="agent-listener",
+        )
+    
+    @functools.cached_property
+    def gemini_provider(self) -> GeminiProvider:
+        """Gemini provider for fallback functionality, created on first use."""
+        return GeminiProvider()
+    
+    @functools.cached_property
+    def supabase_manager(self) -> SupabaseManager:
+        """Supabase manager, created on first use."""
+        return SupabaseManager()
+    
+    def _get_speak_config(self, voice_model: str) -> AgentV1SpeakProviderConfig:
+        """Return the shared speak config for a voice model, building it on first use."""
+        speak_config = self._speak_configs.get(voice_model)
+        if speak_config is None:
+            speak_config = self._speak_configs.setdefault(
+                voice_model,
+                AgentV1SpeakProviderConfig(
+                    provider=AgentV1DeepgramSpeakProvider(
+                        type="deepgram",
+                        model=voice_model,
+                    )
+                ),
+            )
+        return speak_config
     
     def create_agent_settings(
         self,
@@ -114,58 +420,45 @@ class VoiceAgentService:
         temperature: float = 0.7,
         custom_prompt: Optional[str] = None
     ) -> AgentV1SettingsMessage:
-        """Create agent settings configuration."""
+        """Create agent settings configuration (memoized per argument set and day)."""
+        current_date = _get_today_str()
         
-        # Get language code
-        lang_code = self.language_mapping.get(language.lower(), "en")
+        # Normalize the language once; the interned key is reused for the cache and table lookups
+        language = sys.intern(language.lower())
+        return self._cached_agent_settings(
+            language, scenario, voice_model, temperature, custom_prompt, current_date
+        )
+    
+    def _build_agent_settings(
+        self,
+        language: str,
+        scenario: str,
+        voice_model: str,
+        temperature: float,
+        custom_prompt: Optional[str],
+        current_date: str
+    ) -> AgentV1SettingsMessage:
+        """Build the agent settings message; pure in its arguments."""
         
-        # Get personality based on scenario
-        personality = self.agent_personalities.get(scenario, self.agent_personalities["language_tutor"])
+        # Get language code and display name
+        language_info = _LANGUAGE_INFO.get(language) or MappingProxyType({"code": "en", "name": language.title()})
+        lang_code = language_info["code"]
         
         # Create prompt
         if custom_prompt:
             prompt = custom_prompt
         else:
-            prompt = f"""
-            {personality['role']}
-            
-            {personality['instructions']}
-            
-            Current date: {datetime.now().strftime("%A, %B %d, %Y")}
-            
-            Language: {language.title()}
-            Scenario: {scenario.replace('_', ' ').title()}
-            
-            Remember to:
-            - Speak naturally and conversationally
-            - Adjust your language level to match the user
-            - Be patient and encouraging
-            - Provide helpful feedback when appropriate
-            - Keep the conversation flowing naturally
-            """
-        
-        # Configure audio settings
-        audio_config = AgentV1AudioConfig(
-            input=AgentV1AudioInput(
-                encoding="linear16",
-                sample_rate=24000,
-            ),
-            output=AgentV1AudioOutput(
-                encoding="linear16",
-                sample_rate=24000,
-                container="wav",
-            ),
-        )
+            prompt_parts = _DEFAULT_PROMPT_PARTS.get((language, scenario))
+            if prompt_parts is None:
+                # Get personality based on scenario
+                personality = self.agent_personalities.get(scenario, self.agent_personalities["language_tutor"])
+                prompt_parts = _split_default_prompt(language_info["name"], scenario, personality)
+            prompt = current_date.join(prompt_parts)
         
         # Configure agent settings (use specific language for TTS, nova-3 handles multilingual STT)
         agent_config = AgentV1Agent(
             language=lang_code,
-            listen=AgentV1Listen(
-                provider=AgentV1ListenProvider(
-                    type="deepgram",
-                    model=settings.deepgram_model,
-                )
-            ),
+            listen=self._listen_config,
             think=AgentV1Think(
                 provider=AgentV1OpenAiThinkProvider(
                     type="open_ai",
@@ -174,17 +467,12 @@ class VoiceAgentService:
                 ),
                 prompt=prompt,
             ),
-            speak=AgentV1SpeakProviderConfig(
-                provider=AgentV1DeepgramSpeakProvider(
-                    type="deepgram",
-                    model=voice_model,
-                )
-            ),
+            speak=self._get_speak_config(voice_model),
             greeting=f"Hello! I'm your {scenario.replace('_', ' ')} for {language} practice. How can I help you today?",
         )
         
         return AgentV1SettingsMessage(
-            audio=audio_config,
+            audio=self._DEFAULT_AUDIO_CONFIG,
             agent=agent_config,
             tags=[scenario, language],
             experimental=False,
@@ -192,6 +480,12 @@ class VoiceAgentService:
             flags={"history": True}
         )
     
+    def warm_up(self):
+        """Pay first-session costs at startup by building the default agent settings."""
+        for language in _LANGUAGE_MAPPING:
+            for scenario in _AGENT_PERSONALITIES:
+                self.create_agent_settings(language=language, scenario=scenario)
+    
     async def start_conversation(
         self,
         session_id: str,
@@ -206,8 +500,18 @@ class VoiceAgentService:
     ) -> Dict[str, Any]:
         """Start a new voice agent conversation."""
         try:
+            # Each live session holds a listener worker; refuse rather than queue behind them
+            if len(self.active_connections) >= settings.agent_max_sessions:
+                logger.warning(f"Agent session limit reached; not starting session {session_id}")
+                return {
+                    "success": False,
+                    "degraded": True,
+                    "session_id": session_id,
+                    "message": "Voice agent is at capacity, please try again shortly"
+                }
+            
             # Create agent settings with multilingual support
-            settings = self.create_agent_settings(
+            agent_settings = self.create_agent_settings(
                 language=language,
                 scenario=scenario,
                 voice_model=voice_model,
@@ -215,77 +519,89 @@ class VoiceAgentService:
                 custom_prompt=custom_prompt
             )
             
-            print(f"Starting conversation: model={settings.agent.listen.provider.model}, language={settings.agent.language} (nova-3 auto-detects multilingual)")
+            logger.info(f"Starting conversation: model={agent_settings.agent.listen.provider.model}, language={agent_settings.agent.language} (nova-3 auto-detects multilingual)")
             
             # Initialize connection state
-            connection_state = {
-                "session_id": session_id,
-                "user_id": user_id,
-                "language": language,
-                "scenario": scenario,
-                "connection": None,
-                "audio_buffer": bytearray(),
-                "conversation_log": [],
-                "is_active": False,
-                "on_message": on_message,
-                "on_audio": on_audio,
-                "start_time": datetime.utcnow()
-            }
+            connection_state = ConnectionState(
+                session_id=session_id,
+                user_id=user_id,
+                language=language,
+                scenario=scenario,
+                on_message=on_message,
+                on_audio=on_audio
+            )
             
-            # Create WebSocket connection
-            connection = self.deepgram_client.agent.v1.connect()
-            connection_state["connection"] = connection
+            # Fail fast while Deepgram keeps refusing connections
+            if not self._deepgram_breaker.allow_request():
+                logger.warning(f"Deepgram circuit open; not starting session {session_id}")
+                return {
+                    "success": False,
+                    "degraded": True,
+                    "session_id": session_id,
+                    "message": "Voice agent is temporarily unavailable, please try again shortly"
+                }
             
-            # Set up event handlers
-            self._setup_event_handlers(session_id, connection_state)
+            # Open the WebSocket connection; it stays open until the session ends
+            connection_context = self.deepgram_client.agent.v1.connect()
+            try:
+                connection = await asyncio.to_thread(connection_context.__enter__)
+            except Exception:
+                self._deepgram_breaker.record_failure()
+                raise
+            self._deepgram_breaker.record_success()
+            connection_state.connection = connection
+            connection_state.connection_context = connection_context
             
-            # Start connection
-            with connection as conn:
-                connection_state["is_active"] = True
+            try:
+                # Set up event handlers
+                self._setup_event_handlers(session_id, connection_state)
+                
+                connection_state.is_active = True
                 self.active_connections[session_id] = connection_state
                 
                 # Send settings
-                conn.send_settings(settings)
+                connection.send_settings(agent_settings)
                 
                 # Start listening in background
-                listener_thread = threading.Thread(
-                    target=self._start_listening,
-                    args=(session_id, conn),
-                    daemon=True
-                )
-                listener_thread.start()
-                
-                # Save session to database
-                await self._save_conversation_session(session_id, user_id, language, scenario)
-                
-                return {
-                    "success": True,
-                    "session_id": session_id,
-                    "message": "Conversation started successfully",
-                    "settings": {
-                        "language": language,
-                        "scenario": scenario,
-                        "voice_model": voice_model
-                    }
+                self._listener_executor.submit(self._start_listening, session_id, connection, connection_state)
+            except Exception:
+                # Don't leave an open socket or a session slot behind for a session that never started
+                connection_state.is_active = False
+                self.active_connections.pop(session_id, None)
+                await asyncio.to_thread(_close_connection, connection_state)
+                raise
+            
+            # Save session to database (written in the background, off the startup path)
+            self._save_conversation_session(session_id, user_id, language, scenario)
+            
+            return {
+                "success": True,
+                "session_id": session_id,
+                "message": "Conversation started successfully",
+                "settings": {
+                    "language": language,
+                    "scenario": scenario,
+                    "voice_model": voice_model
                 }
-                
+            }
+            
         except Exception as e:
-            print(f"Error starting conversation: {str(e)}")
+            logger.error(f"Error starting conversation: {str(e)}")
             return {
                 "success": False,
                 "session_id": session_id,
                 "message": f"Failed to start conversation: {str(e)}"
             }
     
-    def _setup_event_handlers(self, session_id: str, connection_state: Dict[str, Any]):
+    def _setup_event_handlers(self, session_id: str, connection_state: ConnectionState):
         """Set up event handlers for the voice agent connection."""
-        connection = connection_state["connection"]
+        connection = connection_state.connection
         
         def on_open(event):
             """Handle connection open."""
             self._log_event(session_id, "Connection opened")
-            if connection_state["on_message"]:
-                connection_state["on_message"]({
+            if connection_state.on_message:
+                connection_state.on_message({
                     "type": "connection",
                     "event": "opened",
                     "session_id": session_id
@@ -296,54 +612,42 @@ class VoiceAgentService:
             try:
                 # Handle binary audio data
                 if isinstance(message, bytes):
-                    connection_state["audio_buffer"].extend(message)
-                    if connection_state["on_audio"]:
-                        connection_state["on_audio"](message, session_id)
+                    connection_state.audio_bytes += len(message)
+                    if connection_state.on_audio:
+                        connection_state.on_audio(message, session_id)
                     return
                 
                 # Handle JSON messages
                 msg_type = getattr(message, "type", "Unknown")
                 self._log_event(session_id, f"Received {msg_type} event")
                 
-                # Process specific message types
-                if msg_type == "Welcome":
-                    self._handle_welcome(session_id, message, connection_state)
-                elif msg_type == "SettingsApplied":
-                    self._handle_settings_applied(session_id, message, connection_state)
-                elif msg_type == "ConversationText":
-                    self._handle_conversation_text(session_id, message, connection_state)
-                elif msg_type == "UserStartedSpeaking":
-                    self._handle_user_started_speaking(session_id, message, connection_state)
-                elif msg_type == "AgentThinking":
-                    self._handle_agent_thinking(session_id, message, connection_state)
-                elif msg_type == "AgentStartedSpeaking":
-                    self._handle_agent_started_speaking(session_id, message, connection_state)
-                elif msg_type == "AgentAudioDone":
-                    self._handle_agent_audio_done(session_id, message, connection_state)
-                elif msg_type == "FunctionCallRequest":
-                    self._handle_function_call_request(session_id, message, connection_state)
-                elif msg_type == "Error":
-                    self._handle_error(session_id, message, connection_state)
-                elif msg_type == "Warning":
-                    self._handle_warning(session_id, message, connection_state)
+                # Process specific message types; the SDK parses each type into its own model,
+                # so handlers read that model's required fields directly
+                handler = self._event_handlers.get(msg_type)
+                if handler is not None:
+                    handler(session_id, message, connection_state)
                 
                 # Notify callback
-                if connection_state["on_message"]:
-                    connection_state["on_message"]({
+                if (
+                    connection_state.on_message
+                    and msg_type not in self._muted_events
+                    and (self._notify_events is None or msg_type in self._notify_events)
+                ):
+                    connection_state.on_message({
                         "type": "agent_message",
                         "event": msg_type,
                         "session_id": session_id,
-                        "data": message.__dict__ if hasattr(message, '__dict__') else str(message)
+                        "data": _event_data(message, msg_type)
                     })
                     
             except Exception as e:
-                print(f"Error handling message for session {session_id}: {str(e)}")
+                logger.error(f"Error handling message for session {session_id}: {str(e)}")
         
         def on_error(error):
             """Handle connection errors."""
             self._log_event(session_id, f"Error: {error}")
-            if connection_state["on_message"]:
-                connection_state["on_message"]({
+            if connection_state.on_message:
+                connection_state.on_message({
                     "type": "error",
                     "event": "connection_error",
                     "session_id": session_id,
@@ -353,11 +657,11 @@ class VoiceAgentService:
         def on_close(event):
             """Handle connection close."""
             self._log_event(session_id, "Connection closed")
-            connection_state["is_active"] = False
-            if session_id in self.active_connections:
-                del self.active_connections[session_id]
-            if connection_state["on_message"]:
-                connection_state["on_message"]({
+            connection_state.is_active = False
+            self.active_connections.pop(session_id, None)
+            _close_connection(connection_state)
+            if connection_state.on_message:
+                connection_state.on_message({
                     "type": "connection",
                     "event": "closed",
                     "session_id": session_id
@@ -369,262 +673,262 @@ class VoiceAgentService:
         connection.on(EventType.ERROR, on_error)
         connection.on(EventType.CLOSE, on_close)
     
-    def _start_listening(self, session_id: str, connection):
-        """Start listening for events in background thread."""
+    def _start_listening(self, session_id: str, connection, connection_state: ConnectionState):
+        """Start listening for events on a listener worker (holds the session state alive while running)."""
         try:
             connection.start_listening()
         except Exception as e:
-            print(f"Error in listener thread for session {session_id}: {str(e)}")
+            logger.error(f"Error in listener thread for session {session_id}: {str(e)}")
     
     def send_audio(self, session_id: str, audio_data: bytes) -> bool:
         """Send audio data to the voice agent."""
+        connection_state = self.active_connections.get(session_id)
+        if connection_state is None or not connection_state.is_active:
+            return False
+        
         try:
-            if session_id not in self.active_connections:
-                return False
-            
-            connection_state = self.active_connections[session_id]
-            if not connection_state["is_active"]:
-                return False
-            
-            connection = connection_state["connection"]
-            connection.send_media(audio_data)
-            
-            self._log_event(session_id, f"Sent audio data: {len(audio_data)} bytes")
-            return True
-            
+            connection_state.connection.send_media(audio_data)
         except Exception as e:
-            print(f"Error sending audio for session {session_id}: {str(e)}")
+            logger.error(f"Error sending audio for session {session_id}: {str(e)}")
             return False
+        
+        self._log_event(session_id, f"Sent audio data: {len(audio_data)} bytes")
+        return True
     
     def send_text_message(self, session_id: str, content: str) -> bool:
         """Send a text message as user input."""
+        connection_state = self.active_connections.get(session_id)
+        if connection_state is None or not connection_state.is_active:
+            return False
+        
         try:
-            if session_id not in self.active_connections:
-                return False
-            
-            connection_state = self.active_connections[session_id]
-            if not connection_state["is_active"]:
-                return False
-            
-            connection = connection_state["connection"]
-            connection.send_message({
-                "type": "InjectUserMessage",
-                "content": content
-            })
-            
-            self._log_event(session_id, f"Sent text message: {content}")
-            return True
-            
+            connection_state.connection.send_inject_user_message(
+                AgentV1InjectUserMessageMessage(content=content)
+            )
         except Exception as e:
-            print(f"Error sending text message for session {session_id}: {str(e)}")
+            logger.error(f"Error sending text message for session {session_id}: {str(e)}")
             return False
+        
+        self._log_event(session_id, f"Sent text message: {content}")
+        return True
     
     def update_agent_prompt(self, session_id: str, new_prompt: str) -> bool:
         """Update the agent's prompt during conversation."""
+        connection_state = self.active_connections.get(session_id)
+        if connection_state is None or not connection_state.is_active:
+            return False
+        
         try:
-            if session_id not in self.active_connections:
-                return False
-            
-            connection_state = self.active_connections[session_id]
-            if not connection_state["is_active"]:
-                return False
-            
-            connection = connection_state["connection"]
-            connection.send_message({
-                "type": "UpdatePrompt",
-                "prompt": new_prompt
-            })
-            
-            self._log_event(session_id, "Updated agent prompt")
-            return True
-            
+            connection_state.connection.send_update_prompt(
+                AgentV1UpdatePromptMessage(prompt=new_prompt)
+            )
         except Exception as e:
-            print(f"Error updating prompt for session {session_id}: {str(e)}")
+            logger.error(f"Error updating prompt for session {session_id}: {str(e)}")
             return False
+        
+        self._log_event(session_id, "Updated agent prompt")
+        return True
     
     def update_agent_voice(self, session_id: str, voice_model: str) -> bool:
         """Update the agent's voice model during conversation."""
+        connection_state = self.active_connections.get(session_id)
+        if connection_state is None or not connection_state.is_active:
+            return False
+        
         try:
-            if session_id not in self.active_connections:
-                return False
-            
-            connection_state = self.active_connections[session_id]
-            if not connection_state["is_active"]:
-                return False
-            
-            connection = connection_state["connection"]
-            connection.send_message({
-                "type": "UpdateSpeak",
-                "speak": {
-                    "provider": {
-                        "type": "deepgram",
-                        "model": voice_model
-                    }
-                }
-            })
-            
-            self._log_event(session_id, f"Updated agent voice to: {voice_model}")
-            return True
-            
+            connection_state.connection.send_update_speak(
+                AgentV1UpdateSpeakMessage(speak=self._get_speak_config(voice_model))
+            )
         except Exception as e:
-            print(f"Error updating voice for session {session_id}: {str(e)}")
+            logger.error(f"Error updating voice for session {session_id}: {str(e)}")
             return False
+        
+        self._log_event(session_id, f"Updated agent voice to: {voice_model}")
+        return True
     
     def end_conversation(self, session_id: str) -> bool:
-        """End an active conversation."""
-        try:
-            if session_id not in self.active_connections:
-                return False
-            
-            connection_state = self.active_connections[session_id]
-            connection_state["is_active"] = False
-            
-            # Close connection
-            if connection_state["connection"]:
-                connection_state["connection"].close()
-            
-            # Remove from active connections
-            del self.active_connections[session_id]
-            
-            self._log_event(session_id, "Conversation ended")
-            return True
-            
-        except Exception as e:
-            print(f"Error ending conversation for session {session_id}: {str(e)}")
+        """End an active conversation (blocks while the agent socket closes; call it off the event loop)."""
+        connection_state = self.active_connections.pop(session_id, None)
+        if connection_state is None:
             return False
+        
+        connection_state.is_active = False
+        
+        # Close connection
+        _close_connection(connection_state)
+        
+        self._log_event(session_id, "Conversation ended")
+        return True
+    
+    def shutdown(self):
+        """End every active session and release the listener workers (blocks while sockets close)."""
+        for session_id in list(self.active_connections.keys()):
+            self.end_conversation(session_id)
+        self._listener_executor.shutdown(wait=False)
     
     def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get the conversation history for a session."""
-        try:
-            if session_id not in self.active_connections:
-                return []
-            
-            connection_state = self.active_connections[session_id]
-            return connection_state.get("conversation_log", [])
-            
-        except Exception as e:
-            print(f"Error getting conversation history for session {session_id}: {str(e)}")
+        connection_state = self.active_connections.get(session_id)
+        if connection_state is None:
             return []
+        
+        return list(connection_state.conversation_log)
     
     def get_active_sessions(self) -> List[Dict[str, Any]]:
         """Get list of all active sessions."""
         try:
-            sessions = []
-            for session_id, connection_state in self.active_connections.items():
-                if connection_state["is_active"]:
-                    sessions.append({
-                        "session_id": session_id,
-                        "user_id": connection_state["user_id"],
-                        "language": connection_state["language"],
-                        "scenario": connection_state["scenario"],
-                        "start_time": connection_state["start_time"].isoformat(),
-                        "duration": (datetime.utcnow() - connection_state["start_time"]).total_seconds()
-                    })
-            return sessions
+            now = time.monotonic()
+            return [
+                {
+                    "session_id": session_id,
+                    "user_id": connection_state.user_id,
+                    "language": connection_state.language,
+                    "scenario": connection_state.scenario,
+                    "start_time": connection_state.start_time,
+                    "duration": now - connection_state.start_monotonic
+                }
+                for session_id, connection_state in list(self.active_connections.items())
+                if connection_state.is_active
+            ]
             
         except Exception as e:
-            print(f"Error getting active sessions: {str(e)}")
+            logger.error(f"Error getting active sessions: {str(e)}")
             return []
     
     # Event handler methods
-    def _handle_welcome(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_welcome(self, session_id: str, message, connection_state: ConnectionState):
         """Handle welcome message."""
         self._log_event(session_id, f"Welcome: {message}")
     
-    def _handle_settings_applied(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_settings_applied(self, session_id: str, message, connection_state: ConnectionState):
         """Handle settings applied confirmation."""
         self._log_event(session_id, f"Settings applied: {message}")
     
-    def _handle_conversation_text(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_conversation_text(self, session_id: str, message, connection_state: ConnectionState):
         """Handle conversation text."""
+        # Kept as a datetime; the history response encodes it at the edge
         conversation_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "role": getattr(message, 'role', 'unknown'),
-            "content": getattr(message, 'content', '')
+            "timestamp": datetime.utcnow(),
+            "role": message.role,
+            "content": message.content
         }
-        connection_state["conversation_log"].append(conversation_entry)
+        connection_state.conversation_log.append(conversation_entry)
         self._log_event(session_id, f"Conversation: {conversation_entry}")
     
-    def _handle_user_started_speaking(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_user_started_speaking(self, session_id: str, message, connection_state: ConnectionState):
         """Handle user started speaking event."""
         self._log_event(session_id, "User started speaking")
     
-    def _handle_agent_thinking(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_agent_thinking(self, session_id: str, message, connection_state: ConnectionState):
         """Handle agent thinking event."""
-        self._log_event(session_id, f"Agent thinking: {getattr(message, 'content', '')}")
+        self._log_event(session_id, f"Agent thinking: {message.content}")
     
-    def _handle_agent_started_speaking(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_agent_started_speaking(self, session_id: str, message, connection_state: ConnectionState):
         """Handle agent started speaking event."""
-        # Clear audio buffer for new response
-        connection_state["audio_buffer"] = bytearray()
+        # Start counting audio for the new response
+        connection_state.audio_bytes = 0
         self._log_event(session_id, "Agent started speaking")
     
-    def _handle_agent_audio_done(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_agent_audio_done(self, session_id: str, message, connection_state: ConnectionState):
         """Handle agent audio done event."""
-        audio_buffer = connection_state["audio_buffer"]
-        if len(audio_buffer) > 0:
-            # Save audio file or process as needed
-            self._log_event(session_id, f"Agent audio done: {len(audio_buffer)} bytes")
+        audio_bytes = connection_state.audio_bytes
+        if audio_bytes > 0:
+            self._log_event(session_id, f"Agent audio done: {audio_bytes} bytes")
     
-    def _handle_function_call_request(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_function_call_request(self, session_id: str, message, connection_state: ConnectionState):
         """Handle function call request."""
         self._log_event(session_id, f"Function call request: {message}")
         # Here you would implement function call handling if needed
     
-    def _handle_error(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_error(self, session_id: str, message, connection_state: ConnectionState):
         """Handle error message with enhanced diagnostics."""
-        error_desc = getattr(message, 'description', 'Unknown error')
-        error_code = getattr(message, 'code', 'UNKNOWN')
+        error_desc = message.description
+        error_code = message.code
         
         # Enhanced error handling for configuration issues
         error_lower = error_desc.lower()
         if "language" in error_lower:
-            print(f"[{session_id}] Language configuration error. Ensure language=multi is supported.")
+            logger.warning(f"[{session_id}] Language configuration error. Ensure language=multi is supported.")
         elif "model" in error_lower:
-            print(f"[{session_id}] Model error. Verify nova-3 model supports multilingual transcription.")
+            logger.warning(f"[{session_id}] Model error. Verify nova-3 model supports multilingual transcription.")
         elif "unsupported" in error_lower:
-            print(f"[{session_id}] Unsupported feature. Check Deepgram account has multilingual code-switching enabled.")
+            logger.warning(f"[{session_id}] Unsupported feature. Check Deepgram account has multilingual code-switching enabled.")
         
         self._log_event(session_id, f"Error [{error_code}]: {error_desc}")
     
-    def _handle_warning(self, session_id: str, message, connection_state: Dict[str, Any]):
+    def _handle_warning(self, session_id: str, message, connection_state: ConnectionState):
         """Handle warning message."""
-        warning_desc = getattr(message, 'description', 'Unknown warning')
-        warning_code = getattr(message, 'code', 'UNKNOWN')
+        warning_desc = message.description
+        warning_code = message.code
         self._log_event(session_id, f"Warning [{warning_code}]: {warning_desc}")
     
     def _log_event(self, session_id: str, event: str):
-        """Log an event for a session."""
+        """Log an event for a session (debug only; a no-op at the default level)."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
         try:
-            log_entry = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "event": event
-            }
-            print(f"[{session_id}] {event}")
+            # Monotonic ns is enough to order a session's events; nothing formats it on the hot path
+            log_entry = LogEntry(time.monotonic_ns(), event)
+            logger.debug(f"[{session_id}] {event}")
             
             # Store in connection state if available
-            if session_id in self.active_connections:
-                connection_state = self.active_connections[session_id]
-                if "events_log" not in connection_state:
-                    connection_state["events_log"] = []
-                connection_state["events_log"].append(log_entry)
+            connection_state = self.active_connections.get(session_id)
+            if connection_state is not None:
+                connection_state.events_log.append(log_entry)
                 
         except Exception as e:
-            print(f"Error logging event for session {session_id}: {str(e)}")
+            logger.error(f"Error logging event for session {session_id}: {str(e)}")
     
-    async def _save_conversation_session(self, session_id: str, user_id: str, language: str, scenario: str):
-        """Save conversation session to database."""
-        try:
-            session_data = {
-                "id": session_id,
-                "user_id": user_id,
-                "language": language,
-                "scenario": scenario,
-                "status": "active",
-                "created_at": datetime.utcnow().isoformat()
-            }
-            
-            self.supabase_manager.client.table("agent_sessions").insert(session_data).execute()
+    def _save_conversation_session(self, session_id: str, user_id: str, language: str, scenario: str):
+        """Queue the conversation session row for the background insert writer."""
+        if self._session_rows is None:
+            self._session_rows = asyncio.Queue()
+        if self._session_writer is None or self._session_writer.done():
+            self._session_writer = asyncio.create_task(self._write_conversation_sessions())
+        self._session_rows.put_nowait({
+            "id": session_id,
+            "user_id": user_id,
+            "language": language,
+            "scenario": scenario,
+            "status": "active",
+            "created_at": iso_now()
+        })
+    
+    async def _write_conversation_sessions(self):
+        """Insert queued session rows, one request per batch."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._session_rows.get()]
+            deadline = loop.time() + _SESSION_INSERT_WINDOW
+            while len(batch) < _SESSION_INSERT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._session_rows.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
             
-        except Exception as e:
-            print(f"Error saving conversation session: {str(e)}")
+            try:
+                client = SupabaseManager.get_client()
+                if client is None:
+                    continue
+                query = client.table("agent_sessions").insert(batch)
+                await asyncio.to_thread(query.execute)
+            except Exception as e:
+                logger.error(f"Error saving {len(batch)} conversation session(s): {str(e)}")
+            finally:
+                for _ in batch:
+                    self._session_rows.task_done()
+    
+    async def flush_session_rows(self):
+        """Wait until every queued session row has been written (or has failed)."""
+        if self._session_rows is not None:
+            await self._session_rows.join()
+
+
+@functools.lru_cache(maxsize=1)
+def get_voice_agent_service() -> VoiceAgentService:
+    """Get the shared voice agent service instance."""
+    return VoiceAgentService()
@@ -56,6 +56,12 @@ class Settings(BaseSettings):
     deepgram_language: str = Field(default="multi", env="DEEPGRAM_LANGUAGE")
     deepgram_endpointing: int = Field(default=100, env="DEEPGRAM_ENDPOINTING")
     
+    # Voice Agent Configuration
+    agent_max_sessions: int = Field(default=256, env="AGENT_MAX_SESSIONS")
+    agent_max_conversation_log: int = Field(default=500, env="AGENT_MAX_CONVERSATION_LOG")
+    deepgram_cb_failure_threshold: int = Field(default=5, env="DEEPGRAM_CB_FAILURE_THRESHOLD")
+    deepgram_cb_reset_timeout_seconds: float = Field(default=30.0, env="DEEPGRAM_CB_RESET_TIMEOUT_SECONDS")
+    
     # Supabase Configuration
     # Accept both SUPABASE_KEY and SUPABASE_ANON_KEY
     supabase_url: str = ""
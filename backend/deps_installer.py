@@ -4,6 +4,7 @@ This module ensures that all required dependencies are properly installed,
 with special handling for packages that may need system-level installation.
 """
 
+import os
 import subprocess
 import sys
 import logging
@@ -12,6 +13,14 @@ from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Environment for pip runs: no self-update check, no prompts, and wheels preferred over sdist builds
+_PIP_ENV = {
+    **os.environ,
+    "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+    "PIP_NO_INPUT": "1",
+    "PIP_PREFER_BINARY": "1",
+}
+
 def run_pip_command(command: List[str]) -> bool:
     """Run a pip command and return True if successful."""
     try:
@@ -19,7 +28,8 @@ def run_pip_command(command: List[str]) -> bool:
             [sys.executable, "-m", "pip"] + command,
             capture_output=True,
             text=True,
-            check=True
+            check=True,
+            env=_PIP_ENV
         )
         logger.info(f"Successfully ran: pip {' '.join(command)}")
         return True
@@ -28,6 +38,28 @@ def run_pip_command(command: List[str]) -> bool:
         logger.error(f"stderr: {e.stderr}")
         return False
 
+def is_requirement_satisfied(requirement: str) -> bool:
+    """
+    Check whether an installed distribution already satisfies a requirement,
+    using package metadata only (nothing is imported or executed).
+    Returns False whenever it cannot tell, so pip still gets the final say.
+    """
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        from packaging.requirements import Requirement
+    except ImportError:
+        return False
+    
+    req = Requirement(requirement)
+    if req.extras:
+        # Extras pull in further packages we don't inspect here
+        return False
+    try:
+        installed = version(req.name)
+    except PackageNotFoundError:
+        return False
+    return req.specifier.contains(installed, prereleases=True)
+
 def install_pyaudio() -> bool:
     """Install PyAudio with platform-specific handling."""
     system = platform.system().lower()
@@ -80,19 +112,31 @@ def ensure_dependencies() -> None:
         "gtts>=2.5.0",
         "numpy>=1.24.0",
         "scipy>=1.11.0",
-        "pydub>=0.25.1"
+        "pydub>=0.25.1",
+        "orjson>=3.9.0"
     ]
     
-    # Install regular dependencies
-    for dep in dependencies:
-        logger.info(f"Installing/Checking {dep}...")
-        if not run_pip_command(["install", dep]):
-            logger.warning(f"Failed to install {dep}")
+    # Only hand pip what isn't already installed at a suitable version
+    missing = [dep for dep in dependencies if not is_requirement_satisfied(dep)]
+    logger.info(f"{len(dependencies) - len(missing)} of {len(dependencies)} dependencies already satisfied")
+    
+    # Install regular dependencies in one pip run so the resolver sees them all at once
+    if missing:
+        logger.info(f"Installing/Checking {len(missing)} dependencies...")
+    if missing and not run_pip_command(["install"] + missing):
+        # Fall back to one at a time to find out which ones fail
+        for dep in missing:
+            logger.info(f"Installing/Checking {dep}...")
+            if not run_pip_command(["install", dep]):
+                logger.warning(f"Failed to install {dep}")
     
     # Special handling for PyAudio
-    logger.info("Installing PyAudio (may require special handling)...")
-    if not install_pyaudio():
-        logger.warning("Failed to install PyAudio. Audio features may be limited.")
+    if is_requirement_satisfied("pyaudio>=0.2.14"):
+        logger.info("PyAudio already installed")
+    else:
+        logger.info("Installing PyAudio (may require special handling)...")
+        if not install_pyaudio():
+            logger.warning("Failed to install PyAudio. Audio features may be limited.")
     
     # Upgrade pip to latest version for better compatibility
     logger.info("Upgrading pip...")
@@ -103,8 +147,8 @@ def ensure_dependencies() -> None:
 def check_python_version() -> bool:
     """Check if Python version is compatible."""
     version = sys.version_info
-    if version.major < 3 or (version.major == 3 and version.minor < 8):
-        logger.error(f"Python {version.major}.{version.minor} is not supported. Please use Python 3.8 or higher.")
+    if version.major < 3 or (version.major == 3 and version.minor < 9):
+        logger.error(f"Python {version.major}.{version.minor} is not supported. Please use Python 3.9 or higher.")
         return False
     logger.info(f"Python {version.major}.{version.minor}.{version.micro} is compatible")
     return True
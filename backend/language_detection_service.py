@@ -7,6 +7,7 @@ import os
 import logging
 from typing import Optional, Tuple
 from pathlib import Path
+import urllib.error
 import urllib.request
 
 logger = logging.getLogger(__name__)
@@ -59,8 +60,41 @@ class LanguageDetectionService:
         logger.info(f"Downloading FastText model from {model_url}")
         logger.info(f"Saving to {model_path}")
         
+        # Stream into a .part file so an interrupted download resumes instead of leaving a corrupt model
+        part_path = model_path.with_name(model_path.name + ".part")
         try:
-            urllib.request.urlretrieve(model_url, model_path)
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            request = urllib.request.Request(model_url)
+            if offset:
+                request.add_header("Range", f"bytes={offset}-")
+                logger.info(f"Resuming download at {offset} bytes")
+            
+            try:
+                response = urllib.request.urlopen(request)
+            except urllib.error.HTTPError as e:
+                if not offset or e.code != 416:
+                    raise
+                # Range starts at or past the end: the .part is complete if it matches the full size
+                content_range = e.headers.get("Content-Range", "")
+                if content_range.rpartition("/")[2] == str(offset):
+                    os.replace(part_path, model_path)
+                    logger.info("FastText model downloaded successfully")
+                    return
+                logger.warning(f"Discarding partial download ({content_range or 'no Content-Range'}), starting over")
+                part_path.unlink()
+                return self._download_model(model_path)
+            
+            with response:
+                # 206 means the server honoured the Range header; otherwise start over
+                mode = "ab" if offset and response.status == 206 else "wb"
+                with open(part_path, mode) as f:
+                    while True:
+                        chunk = response.read(1 << 20)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+            
+            os.replace(part_path, model_path)
             logger.info("FastText model downloaded successfully")
         except Exception as e:
             logger.error(f"Failed to download FastText model: {e}")
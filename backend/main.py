@@ -1,6 +1,8 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import sys
 import os
@@ -28,6 +30,7 @@ from narration_routes import router as narration_router
 from voice_routes import router as voice_router
 from conversation_routes import router as conversation_router
 from agent_routes import router as agent_router
+from agent_service import get_voice_agent_service
 from error_logger import get_logger
 
 
@@ -75,10 +78,14 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Supabase not configured - chat history will not be saved")
     
+    # Warm up the voice agent so the first session skips cold-start costs
+    await asyncio.to_thread(get_voice_agent_service().warm_up)
+    
     yield
     
     # Shutdown
     logger.info("Shutting down AI Backend Service")
+    await asyncio.to_thread(get_voice_agent_service().shutdown)
 
 
 # Create FastAPI app
@@ -105,6 +112,17 @@ app.include_router(voice_router)
 app.include_router(conversation_router)
 app.include_router(agent_router)
 
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Turn uncaught route errors into a 500 JSON response, so agent routes need no blanket try/except."""
+    logger.error(f"Unhandled error on {request.method} {request.url.path}: {exc}")
+    # Only the agent routes dropped their own handlers and report the error text; keep others opaque
+    if request.url.path.startswith(agent_router.prefix):
+        return JSONResponse(status_code=500, content={"detail": str(exc)})
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+
 @app.get("/", tags=["General"])
 async def root():
 
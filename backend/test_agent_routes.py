@@ -0,0 +1,83 @@
+"""
+Schema drift check for agent routes that build responses with model_construct.
+
+model_construct skips validation, so these tests make sure the service output
+still fills every field of the response models.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+# Settings requires these keys; nothing in these tests calls the real providers
+for _key in ("GEMINI_API_KEY", "DEEPGRAM_API_KEY", "DEEPSEEK_API_KEY", "ELEVEN_LABS_API_KEY"):
+    os.environ.setdefault(_key, "test-key")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import agent_routes
+from agent_models import AgentActiveSessionsResponse, AgentHistoryResponse, AgentSessionInfo, AgentStartResponse
+from supabase_client import SupabaseManager
+
+
+class _FakeAgentSocket:
+    """Stands in for the SDK's agent socket: accepts settings and listens, silently, until closed."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def on(self, event, callback):
+        pass
+
+    def send_settings(self, settings):
+        pass
+
+    def start_listening(self):
+        self.closed.wait(timeout=5)
+
+
+class _FakeAgentV1:
+    @contextmanager
+    def connect(self):
+        socket = _FakeAgentSocket()
+        try:
+            yield socket
+        finally:
+            socket.closed.set()
+
+
+class _FakeDeepgramClient:
+    def __init__(self):
+        self.agent = type("Agent", (), {"v1": _FakeAgentV1()})()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: None))
+    monkeypatch.setattr(agent_routes.agent_service, "deepgram_client", _FakeDeepgramClient())
+    app = FastAPI()
+    app.include_router(agent_routes.router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_constructed_responses_have_every_model_field(client):
+    response = client.post("/agent/start", json={"user_id": "user-1"})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == set(AgentStartResponse.model_fields)
+    session_id = body["session_id"]
+
+    try:
+        response = client.get("/agent/sessions")
+        assert response.status_code == 200
+        body = response.json()
+        assert set(body) == set(AgentActiveSessionsResponse.model_fields)
+        assert [set(info) for info in body["active_sessions"]] == [set(AgentSessionInfo.model_fields)]
+
+        response = client.get(f"/agent/history/{session_id}")
+        assert response.status_code == 200
+        assert set(response.json()) == set(AgentHistoryResponse.model_fields)
+    finally:
+        agent_routes.agent_service.end_conversation(session_id)
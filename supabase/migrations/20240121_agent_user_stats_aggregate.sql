@@ -0,0 +1,33 @@
+-- Agent User Stats Aggregate
+-- Created: 2024-01-21
+-- Purpose: Compute per-user voice agent statistics from agent_sessions in one query,
+-- replacing the insert-only trigger that maintained agent_user_stats
+
+-- The trigger only ran on INSERT, before a session's duration is known, and its
+-- favorite language/scenario subqueries ordered by an ungrouped column, so every
+-- agent_sessions insert failed once it was installed
+DROP TRIGGER IF EXISTS trigger_update_agent_user_stats ON agent_sessions;
+DROP FUNCTION IF EXISTS update_agent_user_stats();
+
+-- Index for per-user lookups on agent sessions
+CREATE INDEX IF NOT EXISTS idx_agent_sessions_user_id ON agent_sessions(user_id);
+
+-- Returns one row of usage statistics for the given user; durations are filled in
+-- by trigger_update_session_duration when a session ends
+CREATE OR REPLACE FUNCTION get_agent_user_stats(uid TEXT)
+RETURNS TABLE (
+    total_sessions BIGINT,
+    total_duration DOUBLE PRECISION,
+    favorite_language TEXT,
+    favorite_scenario TEXT,
+    last_session TIMESTAMPTZ
+) AS $$
+    SELECT
+        COUNT(*) AS total_sessions,
+        COALESCE(SUM(duration), 0)::DOUBLE PRECISION AS total_duration,
+        MODE() WITHIN GROUP (ORDER BY language) AS favorite_language,
+        MODE() WITHIN GROUP (ORDER BY scenario) AS favorite_scenario,
+        MAX(created_at) AS last_session
+    FROM agent_sessions
+    WHERE user_id = uid;
+$$ LANGUAGE sql STABLE;